@@ -0,0 +1,500 @@
+# benchmark.py
+# In-process load benchmark for the server's ingestion pipeline.
+#
+# Drives /log, emit_student_list and /api/logs/<room_id> through the Flask and
+# Socket.IO test clients with Firebase stubbed out, against a throwaway
+# monitoring.db. Sessions are either generated synthetically or replayed from
+# a JSONL file of recorded /log payloads.
+#
+#   python benchmark.py --students 200 --events 20 --json bench.json
+#   python benchmark.py --replay traffic.jsonl --json bench.json
+#   python benchmark.py --students 200 --compare baseline.json
+#
+# --startup instead measures cold starts: each round imports server.py in a fresh
+# interpreter and polls /api/ready, recording per-subsystem initialization time.
+#
+#   python benchmark.py --startup --startup-rounds 10 --json startup.json
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import stubs
+
+# ==============================================================================
+# ===== CONFIG =====
+# ==============================================================================
+BENCH_ROOM_ID = 'BENCH-ROOM'
+
+DEFAULT_EVENT_MIX = 'keystroke=70,paste=15,window_title=10,drag_drop=5'
+KEYWORDS = ["chatgpt", "gemini", "gfg", "leetcode", "stackoverflow", "chegg"]
+WINDOW_TITLES = ["Visual Studio Code", "Terminal", "ChatGPT - Google Chrome", "LeetCode - Firefox", "Stack Overflow - Edge"]
+
+# Relative slowdown (e.g. 0.10 == 10%) at which --compare reports a regression
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+# ==============================================================================
+
+# --- Stubs ---
+def install_stubs():
+    """Replaces firebase_admin and chatbot so the server imports without credentials or network."""
+    stubs.install_firebase_stub()
+    chatbot = types.ModuleType('chatbot')
+    chatbot.get_bot_response = lambda user_message: "benchmark stub reply"
+    sys.modules.setdefault('chatbot', chatbot)
+
+def load_server(workdir, stubs=True):
+    """Imports server.py with monitoring.db placed in workdir, by default with stubs installed."""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    if repo_dir not in sys.path:
+        sys.path.insert(0, repo_dir)
+    if stubs:
+        install_stubs()
+    os.chdir(workdir)
+    import server
+    return server
+
+# --- Session Generation ---
+def parse_event_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def make_student(index):
+    return {
+        'email': f'student{index:04d}@bench.local',
+        'name': f'Student {index:04d}',
+        'enrollment': f'{100000 + index}',
+        'subsection': f'S{index % 8 + 1}',
+    }
+
+def random_text(rng, length):
+    return ''.join(rng.choices(string.ascii_lowercase + ' ', k=length))
+
+def make_event(rng, event_type, args):
+    if event_type == 'keystroke':
+        text = random_text(rng, args.keystroke_chars)
+        if rng.random() < args.keyword_rate:
+            pos = rng.randrange(len(text) + 1)
+            text = text[:pos] + rng.choice(KEYWORDS) + text[pos:]
+        return {'keystrokes': text}
+    if event_type == 'paste':
+        return {'pasted_content': random_text(rng, rng.randint(args.paste_min, args.paste_max))}
+    if event_type == 'window_title':
+        return {'title': rng.choice(WINDOW_TITLES)}
+    if event_type == 'drag_drop':
+        return {'source_window': rng.choice(WINDOW_TITLES), 'destination_window': rng.choice(WINDOW_TITLES)}
+    return {}
+
+def generate_session(args):
+    """Returns (students, payloads) for a synthetic exam in BENCH_ROOM_ID."""
+    rng = random.Random(args.seed)
+    mix = parse_event_mix(args.event_mix)
+    event_types, weights = list(mix), list(mix.values())
+    students = [make_student(i) for i in range(args.students)]
+
+    payloads = []
+    for _ in range(args.events):
+        for student in students:
+            event_type = rng.choices(event_types, weights)[0]
+            payload = {'room_id': BENCH_ROOM_ID, 'event_type': event_type, 'student_details': student}
+            payload.update(make_event(rng, event_type, args))
+            payloads.append(payload)
+    rng.shuffle(payloads)
+    return students, payloads
+
+def load_replay(path):
+    """Reads recorded /log payloads (one JSON object per line) and the students they mention."""
+    payloads = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            payloads.append(record.get('payload', record))
+
+    students = {}
+    for payload in payloads:
+        payload.setdefault('room_id', BENCH_ROOM_ID)
+        details = payload.get('student_details', {})
+        key = (payload['room_id'], details.get('email', ''))
+        students.setdefault(key, details)
+    return students, payloads
+
+# --- Measurement ---
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'throughput_ops': len(ordered) / elapsed if elapsed > 0 else 0.0,
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p90_ms': percentile(ordered, 90) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'max_ms': ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+def timed(fn, items, concurrency=1):
+    """Calls fn on every item, from `concurrency` threads at once, and summarizes per-call latency.
+
+    Throughput is items / wall-clock time, so with concurrency > 1 it reflects the
+    server under parallel load rather than 1 / latency.
+    """
+    def call(item):
+        t0 = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        latencies = [call(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(call, items))
+    summary = summarize(latencies, time.perf_counter() - start)
+    summary['concurrency'] = max(1, concurrency)
+    return summary
+
+# --- Benchmark Run ---
+def run(args):
+    if args.replay:
+        args.replay = os.path.abspath(args.replay)
+    workdir = tempfile.mkdtemp(prefix='examjudge-bench-')
+    cwd = os.getcwd()
+    try:
+        with contextlib.ExitStack() as stack:
+            # The server prints a line per connect/disconnect; keep it out of the report
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            server = load_server(workdir)
+            return run_phases(server, args, workdir)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run_phases(server, args, workdir):
+    if args.replay:
+        students_by_room, payloads = load_replay(args.replay)
+        session = {'source': 'replay', 'path': args.replay}
+    else:
+        students, payloads = generate_session(args)
+        students_by_room = {(BENCH_ROOM_ID, s['email']): s for s in students}
+        session = {
+            'source': 'synthetic', 'students': args.students, 'events_per_student': args.events,
+            'event_mix': parse_event_mix(args.event_mix), 'keyword_rate': args.keyword_rate,
+            'paste_chars': [args.paste_min, args.paste_max], 'seed': args.seed,
+        }
+    session['wire'] = args.wire
+    rooms = sorted({room for room, _ in students_by_room} | {p['room_id'] for p in payloads})
+
+    http = server.app.test_client()
+    auth_headers = {'Authorization': f'Bearer {stubs.STUB_TOKEN}'}
+    for room in rooms:
+        http.post('/api/rooms', json={'roomId': room}, headers=auth_headers)
+
+    # One examiner dashboard per room, so broadcasts have a listener to serialize for
+    dashboards = []
+    for room in rooms:
+        dashboard = server.socketio.test_client(server.app, flask_test_client=http)
+        dashboard.emit('join_room', {'room_id': room})
+        dashboard.get_received()
+        dashboards.append(dashboard)
+
+    # Flask test clients keep per-client state, so each worker thread gets its own
+    local = threading.local()
+    def thread_http():
+        if not hasattr(local, 'http'):
+            local.http = server.app.test_client()
+        return local.http
+
+    student_clients = []
+    sessions = []  # (room, details, session_token) per connected student
+    wire_sessions = {}  # (room, email) -> session_token reply, for --wire frame
+    wire_formats = [server.wire.WIRE_FORMAT] if args.wire == 'frame' else []
+    def connect_student(item, session_token=None):
+        (room, _), details = item
+        client = server.socketio.test_client(server.app, flask_test_client=thread_http())
+        client.emit('student_connect', {'room_id': room, 'student_details': details, 'session_token': session_token, 'wire_formats': wire_formats})
+        student_clients.append(client)
+        for message in client.get_received():
+            if message['name'] == 'session_token':
+                reply = message['args'][0]
+                sessions.append((item, reply['session_token']))
+                wire_sessions[item[0]] = reply
+
+    def encode(payload):
+        """Returns (body, content_type) the way student_monitor.py would send this payload.
+
+        --wire legacy sends the untruncated JSON payload of clients that predate paste truncation.
+        """
+        if args.wire == 'legacy':
+            return json.dumps(payload).encode('utf-8'), 'application/json'
+        reply = wire_sessions.get((payload['room_id'], payload.get('student_details', {}).get('email', '')), {})
+        data = {key: value for key, value in payload.items() if key not in ('room_id', 'event_type', 'student_details')}
+        if payload['event_type'] == 'paste':
+            content, length, digest = server.wire.truncate_paste(payload.get('pasted_content', ''), reply.get('max_paste_chars', server.MAX_PASTE_CHARS))
+            data = {'pasted_content': content, 'pasted_length': length, 'truncated_sha256': digest}
+        if args.wire != 'frame' or 'wire_id' not in reply:
+            data.update({'room_id': payload['room_id'], 'event_type': payload['event_type'], 'student_details': payload['student_details']})
+            return json.dumps(data).encode('utf-8'), 'application/json'
+        return server.wire.encode_frame(reply['wire_id'], payload['event_type'], data), server.wire.CONTENT_TYPE
+
+    def timed_parse(request_bodies):
+        """Times the server's own /log parsing, read_log_payload() plus read_paste() for pastes.
+
+        The request context is built outside the timed region: its setup costs more than
+        the parsing itself and would hide the difference between encodings.
+        """
+        latencies = []
+        for body, content_type in request_bodies:
+            with server.app.test_request_context('/log', method='POST', data=body, content_type=content_type):
+                t0 = time.perf_counter()
+                data, error = server.read_log_payload()
+                if error is None and data.get('event_type') == 'paste':
+                    server.read_paste(data)
+                latencies.append(time.perf_counter() - t0)
+            if error is not None:
+                raise RuntimeError(f"read_log_payload rejected a benchmark payload: {error[0].get_data(as_text=True)}")
+        return summarize(latencies, sum(latencies))
+
+    def post_log(request_body):
+        body, content_type = request_body
+        response = thread_http().post('/log', data=body, content_type=content_type)
+        if response.status_code != 200:
+            raise RuntimeError(f"/log returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    def drain(_=None):
+        # Join/leave broadcasts are collapsed and sent after a short window
+        time.sleep(server.STUDENT_LIST_BROADCAST_WINDOW * 2)
+        received = 0
+        for dashboard in dashboards:
+            received += len(dashboard.get_received())
+        for client in student_clients:
+            client.get_received()
+        return received
+
+    results = {}
+    results['student_connect'] = timed(connect_student, list(students_by_room.items()), args.concurrency)
+    results['student_connect']['broadcasts_received'] = drain()
+
+    bodies = [encode(payload) for payload in payloads]
+    results['payload_parse'] = timed_parse(bodies)
+    results['payload_parse_paste'] = timed_parse([entry for entry, payload in zip(bodies, payloads) if payload['event_type'] == 'paste'])
+    results['log_activity'] = timed(post_log, bodies, args.concurrency)
+    results['log_activity']['broadcasts_received'] = drain()
+    results['log_activity']['bytes_per_event'] = sum(len(body) for body, _ in bodies) / len(bodies) if bodies else 0.0
+
+    list_rounds = [room for room in rooms for _ in range(args.list_rounds)]
+    results['emit_student_list'] = timed(server.emit_student_list, list_rounds)
+    drain()
+
+    query_rounds = [room for room in rooms for _ in range(args.query_rounds)]
+    results['get_logs_for_room'] = timed(lambda room: http.get(f'/api/logs/{room}', headers=auth_headers), query_rounds)
+
+    # Reconnect storm: every student drops and comes back with its session token
+    for client in student_clients:
+        client.disconnect()
+    student_clients.clear()
+    drain()
+    previous_sessions = list(sessions)
+    sessions.clear()
+    results['student_resume'] = timed(lambda entry: connect_student(entry[0], entry[1]), previous_sessions, args.concurrency)
+    results['student_resume']['broadcasts_received'] = drain()
+
+    for client in student_clients + dashboards:
+        client.disconnect()
+
+    server.flush_sessions()  # write queued session and connection rows before measuring the DB
+    db_path = os.path.join(workdir, 'monitoring.db')
+    return {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'session': session,
+        'concurrency': args.concurrency,
+        'rooms': len(rooms),
+        'payloads': len(payloads),
+        'results': results,
+        'db_size_bytes': os.path.getsize(db_path) if os.path.exists(db_path) else 0,
+    }
+
+# --- Startup Benchmark ---
+READY_POLL_INTERVAL = 0.005
+READY_TIMEOUT = 60
+
+def startup_probe(args):
+    """Runs inside a fresh interpreter: import server, wait for /api/ready, dump timings to args.startup_probe."""
+    out_path = os.path.abspath(args.startup_probe)
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        server = load_server(os.getcwd(), stubs=not args.real_deps)
+        imported = time.perf_counter()
+
+        client = server.create_app().test_client()
+        first = client.get('/api/ready')
+        first_response = time.perf_counter()
+        response = first
+        # A failed required subsystem keeps /api/ready at 503 for good, so stop polling
+        while (response.status_code != 200 and time.perf_counter() - started < READY_TIMEOUT
+               and not any(s['state'] == 'failed' for s in response.get_json()['subsystems'].values())):
+            time.sleep(READY_POLL_INTERVAL)
+            response = client.get('/api/ready')
+        ready = time.perf_counter()
+
+    result = {
+        'import_seconds': imported - started,
+        'first_response_seconds': first_response - started,
+        'ready_seconds': ready - started,
+        'ready': response.status_code == 200,
+        'subsystems': response.get_json()['subsystems'],
+    }
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    return 0
+
+def run_startup(args):
+    script = os.path.abspath(__file__)
+    samples = []
+    for _ in range(args.startup_rounds):
+        workdir = tempfile.mkdtemp(prefix='examjudge-startup-')
+        try:
+            out_path = os.path.join(workdir, 'probe.json')
+            cmd = [sys.executable, script, '--startup-probe', out_path]
+            if args.real_deps:
+                cmd.append('--real-deps')
+            t0 = time.perf_counter()
+            subprocess.run(cmd, cwd=workdir, check=True)
+            process_seconds = time.perf_counter() - t0
+            with open(out_path, encoding='utf-8') as f:
+                sample = json.load(f)
+            sample['process_seconds'] = process_seconds
+            samples.append(sample)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    series = {
+        'server_import': [s['import_seconds'] for s in samples],
+        'first_response': [s['first_response_seconds'] for s in samples],
+        'ready': [s['ready_seconds'] for s in samples],
+        'process_total': [s['process_seconds'] for s in samples],
+    }
+    for name in samples[0]['subsystems'] if samples else []:
+        series[f'init_{name}'] = [s['subsystems'][name]['seconds'] for s in samples if s['subsystems'][name]['seconds'] is not None]
+
+    return {
+        'mode': 'startup',
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'rounds': len(samples),
+        'real_deps': args.real_deps,
+        'all_ready': all(s['ready'] for s in samples),
+        'results': {name: summarize(values, sum(values)) for name, values in series.items() if values},
+    }
+
+# --- Reporting ---
+def print_report(report):
+    print("=====================================================")
+    if report.get('mode') == 'startup':
+        print("      EXAMJUDGE STARTUP BENCHMARK")
+        print(f"  Rounds: {report['rounds']}   Real dependencies: {report['real_deps']}   All ready: {report['all_ready']}")
+    else:
+        print("      EXAMJUDGE INGESTION BENCHMARK")
+        print(f"  Rooms: {report['rooms']}   Payloads: {report['payloads']}   DB size: {report['db_size_bytes'] / 1024:.1f} KiB")
+        print(f"  Wire: {report['session']['wire']}   Concurrency: {report.get('concurrency', 1)}   Bytes/event: {report['results']['log_activity']['bytes_per_event']:.0f}")
+    print("=====================================================")
+    print(f"{'phase':<20}{'count':>8}{'ops/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for phase, stats in report['results'].items():
+        print(f"{phase:<20}{stats['count']:>8}{stats['throughput_ops']:>10.1f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+def compare(report, baseline, threshold):
+    """Prints per-phase p50/p99 deltas against a previous JSON report. Returns True on regression."""
+    regressed = False
+    print(f"\nComparison against baseline ({baseline.get('created_at', 'unknown')}):")
+    for phase, stats in report['results'].items():
+        base = baseline.get('results', {}).get(phase)
+        if not base:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if base[metric] <= 0:
+                continue
+            delta = (stats[metric] - base[metric]) / base[metric]
+            flag = ''
+            if delta > threshold:
+                flag = '  <-- REGRESSION'
+                regressed = True
+            print(f"  {phase:<20}{metric:<8}{base[metric]:>10.2f} -> {stats[metric]:>8.2f} ms ({delta:+.1%}){flag}")
+    base_bytes = baseline.get('results', {}).get('log_activity', {}).get('bytes_per_event', 0)
+    if base_bytes and 'log_activity' in report['results']:
+        bytes_per_event = report['results']['log_activity']['bytes_per_event']
+        print(f"  {'bytes_per_event':<28}{base_bytes:>10.0f} -> {bytes_per_event:>8.0f} ({(bytes_per_event - base_bytes) / base_bytes:+.1%})")
+    base_db = baseline.get('db_size_bytes', 0)
+    if base_db and 'db_size_bytes' in report:
+        print(f"  {'db_size_bytes':<28}{base_db:>10} -> {report['db_size_bytes']:>8} ({(report['db_size_bytes'] - base_db) / base_db:+.1%})")
+    return regressed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ExamJudge ingestion pipeline in-process.")
+    parser.add_argument('--students', type=int, default=100, help="Synthetic students in the exam room")
+    parser.add_argument('--events', type=int, default=10, help="Synthetic /log events per student")
+    parser.add_argument('--event-mix', default=DEFAULT_EVENT_MIX, help="Weighted event types, e.g. 'keystroke=70,paste=30'")
+    parser.add_argument('--keyword-rate', type=float, default=0.05, help="Fraction of keystroke batches containing a banned keyword")
+    parser.add_argument('--keystroke-chars', type=int, default=80, help="Characters per keystroke batch")
+    parser.add_argument('--paste-min', type=int, default=20, help="Minimum pasted characters")
+    parser.add_argument('--paste-max', type=int, default=2000, help="Maximum pasted characters")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--replay', help="JSONL file of recorded /log payloads to replay instead of generating")
+    parser.add_argument('--wire', choices=['json', 'frame', 'legacy'], default='json',
+                        help="Encoding used for /log payloads; 'legacy' is untruncated JSON from older clients")
+    parser.add_argument('--concurrency', type=int, default=1, help="Threads driving student_connect, /log and student_resume at once")
+    parser.add_argument('--list-rounds', type=int, default=50, help="Direct emit_student_list calls per room")
+    parser.add_argument('--query-rounds', type=int, default=10, help="GET /api/logs/<room_id> calls per room")
+    parser.add_argument('--startup', action='store_true', help="Measure cold-start time instead of ingestion")
+    parser.add_argument('--startup-rounds', type=int, default=5, help="Fresh interpreters to start with --startup")
+    parser.add_argument('--real-deps', action='store_true', help="With --startup, import the installed firebase_admin/chatbot instead of stubs")
+    parser.add_argument('--startup-probe', help=argparse.SUPPRESS)
+    parser.add_argument('--verbose', action='store_true', help="Show the server's own console output")
+    parser.add_argument('--json', dest='json_path', help="Write the report as JSON to this path")
+    parser.add_argument('--compare', help="Previous JSON report to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="Relative slowdown counted as a regression")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.startup_probe:
+        return startup_probe(args)
+    report = run_startup(args) if args.startup else run(args)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
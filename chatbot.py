@@ -1,14 +1,19 @@
-import google.generativeai as genai
-from dotenv import load_dotenv
 import os
-load_dotenv()
-# Configure Gemini
-genai.configure(
-    api_key=os.getenv("GENAI_API_KEY")
-)
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-# Choose a fast, smart model
-model = genai.GenerativeModel("gemini-2.5-flash")
+# --- Generation Settings ---
+MODEL_NAME = "gemini-2.5-flash"
+GENERATION_WORKERS = 4
+GENERATION_TIMEOUT_SECONDS = 20
+
+# --- Answer Cache Settings ---
+# Examiners tend to ask the same setup questions, so replies are cached per normalized question
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL_SECONDS = 30 * 60
 
 # 🧠 Project Context
 PROJECT_CONTEXT = """
@@ -42,12 +47,100 @@ If a user asks something unrelated (like 'who are you?' or 'tell me a joke'), po
 Always be friendly, concise, and technical when needed.
 """
 
-def get_bot_response(user_message: str) -> str:
+# --- Model (loaded on first use) ---
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Configures Gemini and returns the model, importing the SDK only on first call."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                from dotenv import load_dotenv
+                load_dotenv()
+                genai.configure(api_key=os.getenv("GENAI_API_KEY"))
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+def set_model(model):
+    """Swaps in another model (anything with generate_content), e.g. a local stub, and clears the cache."""
+    global _model
+    with _model_lock:
+        _model = model
+    clear_cache()
+
+# --- Cache & In-Flight Requests ---
+_executor = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix="chatbot")
+_cache = OrderedDict()  # normalized question -> (expires_at, reply)
+_in_flight = {}  # normalized question -> Future shared by identical concurrent questions
+_cache_lock = threading.RLock()
+
+def normalize_question(user_message: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation so trivially different phrasings share a cache entry."""
+    return re.sub(r'\s+', ' ', user_message).strip().lower().rstrip('?!. ')
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        expires_at, reply = entry
+        if expires_at < time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return reply
+
+def _cache_put(key, reply):
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + CACHE_TTL_SECONDS, reply)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def _on_generation_done(key, future):
+    with _cache_lock:
+        # A retry may already have replaced this (failed) future; leave the retry in place
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+    if not future.cancelled() and future.exception() is None:
+        _cache_put(key, future.result())
+
+def _generate(user_message: str) -> str:
+    prompt = f"{PROJECT_CONTEXT}\nUser: {user_message}\nAssistant:"
+    response = get_model().generate_content(prompt)
+    return response.text
+
+def get_bot_response(user_message: str, timeout: float = GENERATION_TIMEOUT_SECONDS) -> str:
     if not user_message.strip():
         return "Please type something related to ExamJudge."
+
+    key = normalize_question(user_message)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    # Identical questions already being generated wait on the same call instead of starting another
+    with _cache_lock:
+        future = _in_flight.get(key)
+        # A failed call may still be listed for a moment after its waiters wake; don't hand that failure out again
+        if future is not None and future.done() and (future.cancelled() or future.exception() is not None):
+            future = None
+        if future is None:
+            future = _executor.submit(_generate, user_message)
+            _in_flight[key] = future
+            future.add_done_callback(lambda f, key=key: _on_generation_done(key, f))
+
     try:
-        prompt = f"{PROJECT_CONTEXT}\nUser: {user_message}\nAssistant:"
-        response = model.generate_content(prompt)
-        return response.text
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # Generation keeps running in the pool; its reply is cached for the next ask
+        return "⚠️ Gemini is taking too long to respond. Please try again in a moment."
     except Exception as e:
         return f"⚠️ Gemini error: {e}"
@@ -27,6 +27,18 @@ def init_db():
                        )
                    ''')
 
+    # Student sessions, so reconnecting clients keep their stats across server restarts
+    cursor.execute('''
+                   CREATE TABLE IF NOT EXISTS sessions (
+                                                       token TEXT PRIMARY KEY NOT NULL,
+                                                       room_id TEXT NOT NULL,
+                                                       details TEXT NOT NULL,
+                                                       stats TEXT NOT NULL,
+                                                       updated_at REAL NOT NULL,
+                                                       FOREIGN KEY (room_id) REFERENCES rooms (id) ON DELETE CASCADE
+                       )
+                   ''')
+
     conn.commit()
     conn.close()
     print("Database initialized successfully.")
\ No newline at end of file
@@ -1,29 +1,23 @@
+import time
+_import_started = time.perf_counter()  # startup_timings()['import'] includes the imports below
+
+import atexit
 import os
+import json
+import secrets
 import sqlite3
+import threading
 from flask import Flask, request, jsonify, send_from_directory, g
 from flask_socketio import SocketIO, join_room, emit, disconnect
 from flask_cors import CORS
 import re
 from datetime import datetime
 import database
+import wire
 from functools import wraps
 
-# --- Firebase Imports ---
-import firebase_admin
-from firebase_admin import credentials, auth
-
-# --- App Initialization & DB Setup ---
-database.init_db()
-
-# --- Initialize Firebase Admin ---
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
-    print("Firebase Admin SDK initialized successfully.")
-except Exception as e:
-    print(f"Warning: Firebase Admin SDK failed to initialize: {e}")
-    print("Auth features will fail without a valid serviceAccountKey.json")
-
+# --- App Initialization ---
+# Database, Firebase and chatbot setup is deferred; see "Lazy Subsystem Startup" below
 app = Flask(__name__, static_folder='dist')
 CORS(app, resources={r"/api/*": {"origins": "*"}, r"/log": {"origins": "*"}})
 socketio = SocketIO(app, cors_allowed_origins="*")
@@ -31,10 +25,111 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # --- Constants ---
 CHEATING_KEYWORDS_REGEX = re.compile(r'chatgpt|gemini|gfg|leetcode|stackoverflow|chegg', re.IGNORECASE)
 HIGH_CHAR_PASTE_THRESHOLD = 100
-
-# STRUCTURE: room_id -> { sid -> { 'details': {...}, 'stats': {'keywords': 0, ...} } }
+# Pasted content beyond this many characters is not stored; only its SHA-256 is kept
+MAX_PASTE_CHARS = int(os.getenv('EXAMJUDGE_MAX_PASTE_CHARS', 10000))
+SHA256_HEX_REGEX = re.compile(r'[0-9a-f]{64}')
+# Hard cap on any request body; student monitors truncate pastes well below this before sending
+MAX_REQUEST_BYTES = int(os.getenv('EXAMJUDGE_MAX_REQUEST_BYTES', 16 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+# Returning students present the token issued on their first connect to resume their session
+SESSION_TTL_SECONDS = 6 * 60 * 60
+# Stat changes are written to the sessions table in batches, not once per /log event
+SESSION_FLUSH_INTERVAL = 5
+SESSION_PRUNE_INTERVAL = 10 * 60
+# Student list broadcasts triggered by joins/leaves within this window are collapsed into one
+STUDENT_LIST_BROADCAST_WINDOW = 0.5
+
+# STRUCTURE: room_id -> { sid -> { 'details': {...}, 'stats': {'keywords': 0, ...}, 'session_token': str } }
 room_participants = {}
 
+# STRUCTURE: session_token -> { 'room_id': str, 'details': {...}, 'stats': {...}, 'updated_at': float, 'wire_id': int }
+# The stats dict is shared with the student's room_participants entry; sessions also persist in the DB.
+student_sessions = {}
+
+# STRUCTURE: wire_id -> session_token, for clients that negotiated the compact frame encoding.
+# IDs are random rather than sequential so a stale ID from before a restart doesn't hit another student.
+wire_sessions = {}
+
+# --- Lazy Subsystem Startup ---
+# Nothing slow runs at import time: each subsystem initializes once, either on
+# first use or from the warm-up thread started by create_app(). After a restart
+# the server starts answering reconnecting students straight away.
+class Subsystem:
+    def __init__(self, name, init_fn, required=True):
+        self.name = name
+        self.required = required  # /api/ready answers 503 until every required subsystem is ready
+        self.state = 'pending'    # pending -> ready | failed
+        self.value = None
+        self.error = None
+        self.seconds = None
+        self._init_fn = init_fn
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        """Runs the initializer on first call (other callers wait for it) and returns its result, or None if it failed."""
+        if self.state == 'pending':
+            with self._lock:
+                if self.state == 'pending':
+                    started = time.perf_counter()
+                    try:
+                        self.value = self._init_fn()
+                        self.state = 'ready'
+                    except Exception as e:
+                        self.error = str(e)
+                        self.state = 'failed'
+                        print(f"Warning: {self.name} failed to initialize: {e}")
+                    self.seconds = time.perf_counter() - started
+                    print(f"Startup: {self.name} {self.state} in {self.seconds * 1000:.0f} ms")
+        return self.value
+
+    def status(self):
+        return {'state': self.state, 'required': self.required, 'seconds': self.seconds, 'error': self.error}
+
+def _init_firebase():
+    import firebase_admin
+    from firebase_admin import credentials, auth
+    try:
+        cred = credentials.Certificate("serviceAccountKey.json")
+        firebase_admin.initialize_app(cred)
+    except Exception:
+        print("Auth features will fail without a valid serviceAccountKey.json")
+        raise
+    print("Firebase Admin SDK initialized successfully.")
+    return auth
+
+def _init_chatbot():
+    import chatbot
+    return chatbot
+
+SUBSYSTEMS = {
+    'database': Subsystem('database', database.init_db),
+    'firebase': Subsystem('firebase', _init_firebase),
+    'chatbot': Subsystem('chatbot', _init_chatbot, required=False),
+}
+
+_warm_up_thread = None
+_warm_up_lock = threading.Lock()
+
+def start_warm_up():
+    """Initializes the required subsystems on a background thread. Safe to call more than once."""
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            required = [s for s in SUBSYSTEMS.values() if s.required]
+            _warm_up_thread = threading.Thread(target=lambda: [s.ensure() for s in required], name='warm-up', daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+def is_ready():
+    return all(s.state == 'ready' for s in SUBSYSTEMS.values() if s.required)
+
+def startup_timings():
+    """Seconds spent importing server.py and initializing each subsystem so far."""
+    timings = {'import': _import_seconds}
+    timings.update({name: s.seconds for name, s in SUBSYSTEMS.items()})
+    return timings
+
 # --- Authentication Decorator ---
 def login_required(f):
     @wraps(f)
@@ -43,6 +138,10 @@ def login_required(f):
         if not auth_header or not auth_header.startswith("Bearer "):
             return jsonify({"error": "Unauthorized", "message": "Missing or invalid token"}), 401
 
+        auth = SUBSYSTEMS['firebase'].ensure()
+        if auth is None:
+            return jsonify({"error": "Service Unavailable", "message": "Authentication service unavailable"}), 503
+
         token = auth_header.split("Bearer ")[1]
         try:
             decoded_token = auth.verify_id_token(token)
@@ -73,8 +172,27 @@ def emit_student_list(room):
     student_list.sort(key=lambda x: x['name'])
     socketio.emit('update_student_list', {'students': student_list}, room=room)
 
+# Joins and leaves arrive in bursts when many clients reconnect at once; each room
+# gets at most one pending broadcast, sent after STUDENT_LIST_BROADCAST_WINDOW.
+_pending_student_lists = set()
+_pending_student_lists_lock = threading.Lock()
+
+def schedule_student_list(room):
+    with _pending_student_lists_lock:
+        if room in _pending_student_lists:
+            return
+        _pending_student_lists.add(room)
+    socketio.start_background_task(_flush_student_list, room)
+
+def _flush_student_list(room):
+    socketio.sleep(STUDENT_LIST_BROADCAST_WINDOW)
+    with _pending_student_lists_lock:
+        _pending_student_lists.discard(room)
+    emit_student_list(room)
+
 # --- Database Helper ---
 def log_to_db(timestamp, room_id, student_id, event_type, message, details=""):
+    SUBSYSTEMS['database'].ensure()
     try:
         conn = sqlite3.connect('monitoring.db')
         cursor = conn.cursor()
@@ -83,7 +201,213 @@ def log_to_db(timestamp, room_id, student_id, event_type, message, details=""):
         conn.close()
     except Exception as e: print(f"Database logging error: {e}")
 
+@app.before_request
+def ensure_database():
+    SUBSYSTEMS['database'].ensure()
+
+# --- Session Helpers ---
+def new_stats():
+    return {'keywords': 0, 'paste': 0, 'window_title': 0, 'drag_drop': 0}
+
+def create_session(room_id, student_details):
+    token = secrets.token_urlsafe(16)
+    session = {'room_id': room_id, 'details': student_details, 'stats': new_stats(), 'updated_at': time.time()}
+    student_sessions[token] = session
+    touch_session(token)  # the row is inserted by the next flush
+    return token, session
+
+def find_session(token, room_id, student_email):
+    """Returns the stored session for token if it belongs to this student and room and hasn't expired."""
+    if not token:
+        return None
+    session = student_sessions.get(token)
+    if session is not None and session['updated_at'] < time.time() - SESSION_TTL_SECONDS:
+        drop_session(token)
+        return None
+    if session is None:
+        # Not in memory, e.g. after a server restart
+        SUBSYSTEMS['database'].ensure()
+        try:
+            conn = sqlite3.connect('monitoring.db')
+            cursor = conn.cursor()
+            cursor.execute('SELECT room_id, details, stats, updated_at FROM sessions WHERE token = ? AND updated_at > ?', (token, time.time() - SESSION_TTL_SECONDS))
+            row = cursor.fetchone()
+            conn.close()
+        except Exception as e:
+            print(f"Database session lookup error: {e}")
+            return None
+        if not row:
+            return None
+        session = {'room_id': row[0], 'details': json.loads(row[1]), 'stats': json.loads(row[2]), 'updated_at': row[3]}
+        student_sessions[token] = session
+    if session['room_id'] != room_id or session['details'].get('email') != student_email:
+        return None
+    return session
+
+def touch_session(token):
+    """Marks a session as active; its stats and updated_at reach the DB on the next flush."""
+    session = student_sessions.get(token)
+    if session is None:
+        return
+    session['updated_at'] = time.time()
+    with _sessions_lock:
+        _dirty_sessions.add(token)
+
+def drop_session(token):
+    session = student_sessions.pop(token, None)
+    if session and session.get('wire_id') is not None:
+        wire_sessions.pop(session['wire_id'], None)
+    with _sessions_lock:
+        _dirty_sessions.discard(token)
+
+def assign_wire_id(token):
+    session = student_sessions[token]
+    if session.get('wire_id') is None:
+        wire_id = secrets.randbits(32)
+        while wire_id in wire_sessions:
+            wire_id = secrets.randbits(32)
+        session['wire_id'] = wire_id
+        wire_sessions[wire_id] = token
+    return session['wire_id']
+
+def read_log_payload():
+    """Returns the /log payload as a dict, decoding compact frames via the sender's wire session. Returns (data, error_response)."""
+    if request.mimetype != wire.CONTENT_TYPE:
+        return request.get_json(silent=True), None
+    try:
+        wire_id, event_type, fields = wire.decode_frame(request.get_data(), max_body=wire.max_body_size(MAX_PASTE_CHARS))
+    except wire.FrameError as e:
+        return None, (jsonify({"status": "error", "message": f"Invalid frame: {e}"}), 400)
+    session = student_sessions.get(wire_sessions.get(wire_id))
+    if session is None:
+        # Unknown ID, e.g. after a restart: the client falls back to JSON until it reconnects
+        return None, (jsonify({"status": "error", "message": "Unknown wire session"}), 409)
+    data = {'room_id': session['room_id'], 'event_type': event_type, 'student_details': session['details']}
+    data.update(fields)
+    return data, None
+
+def read_paste(data):
+    """Returns (stored_content, full_length, truncated_sha256) for a paste event.
+
+    Content beyond MAX_PASTE_CHARS is kept only as a hash. Student monitors truncate before
+    sending and report the full length and the hash of what they cut; those values are used
+    only when they are well-formed and consistent with the content received. If the client
+    cut at a larger limit than ours, both hashes are kept as "<ours>+<client's>", in order.
+    """
+    content = data.get('pasted_content', '')
+    if not isinstance(content, str):
+        content = str(content)
+
+    digest = data.get('truncated_sha256') or ''
+    length = data.get('pasted_length')
+    try:
+        length = int(length) if isinstance(length, (int, str)) and not isinstance(length, bool) else len(content)
+    except ValueError:
+        length = len(content)
+    if length <= len(content) or not isinstance(digest, str) or not SHA256_HEX_REGEX.fullmatch(digest):
+        length, digest = len(content), ''
+
+    if len(content) > MAX_PASTE_CHARS:
+        kept, _, our_digest = wire.truncate_paste(content, MAX_PASTE_CHARS)
+        return kept, length, f"{our_digest}+{digest}" if digest else our_digest
+    return content, length, digest
+
+# Sessions touched since the last flush, and Connection audit rows waiting to be written.
+# Both go to the DB together every SESSION_FLUSH_INTERVAL, so a reconnect storm costs one
+# transaction per interval instead of a connection and commit per student; a crash loses
+# at most one interval.
+_dirty_sessions = set()
+_pending_connection_logs = []
+_sessions_lock = threading.Lock()
+_session_maintenance_started = False
+
+def log_connection(room_id, student_id, message, details=""):
+    """Queues a 'Connection' audit row for the next flush_sessions()."""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with _sessions_lock:
+        _pending_connection_logs.append((timestamp, room_id, student_id, 'Connection', message, details))
+
+def flush_sessions():
+    """Upserts every touched session and writes queued connection rows in one transaction."""
+    with _sessions_lock:
+        tokens = list(_dirty_sessions)
+        _dirty_sessions.clear()
+        log_rows = list(_pending_connection_logs)
+        _pending_connection_logs.clear()
+    session_rows = []
+    for token in tokens:
+        session = student_sessions.get(token)
+        if session is not None:
+            session_rows.append((token, session['room_id'], json.dumps(session['details']), json.dumps(session['stats']), session['updated_at']))
+    if not session_rows and not log_rows:
+        return
+    SUBSYSTEMS['database'].ensure()
+    try:
+        conn = sqlite3.connect('monitoring.db')
+        cursor = conn.cursor()
+        cursor.executemany('''INSERT INTO sessions (token, room_id, details, stats, updated_at) VALUES (?, ?, ?, ?, ?)
+                              ON CONFLICT(token) DO UPDATE SET stats = excluded.stats, updated_at = excluded.updated_at''', session_rows)
+        cursor.executemany('INSERT INTO logs (timestamp, room_id, student_id, event_type, message, details) VALUES (?, ?, ?, ?, ?, ?)', log_rows)
+        conn.commit()
+        conn.close()
+    except Exception as e: print(f"Database session flush error: {e}")
+
+atexit.register(flush_sessions)
+
+def prune_sessions():
+    """Keeps connected students' sessions alive and forgets expired ones, in memory and in the DB."""
+    for participants in list(room_participants.values()):
+        for participant in list(participants.values()):
+            touch_session(participant.get('session_token'))
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    for token, session in list(student_sessions.items()):
+        if session['updated_at'] < cutoff:
+            drop_session(token)
+    flush_sessions()
+    SUBSYSTEMS['database'].ensure()
+    try:
+        conn = sqlite3.connect('monitoring.db')
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM sessions WHERE updated_at < ?', (cutoff,))
+        conn.commit()
+        conn.close()
+    except Exception as e: print(f"Database session prune error: {e}")
+
+def _session_maintenance():
+    last_prune = time.time()
+    while True:
+        socketio.sleep(SESSION_FLUSH_INTERVAL)
+        flush_sessions()
+        if time.time() - last_prune >= SESSION_PRUNE_INTERVAL:
+            prune_sessions()
+            last_prune = time.time()
+
+def start_session_maintenance():
+    global _session_maintenance_started
+    with _sessions_lock:
+        if _session_maintenance_started:
+            return
+        _session_maintenance_started = True
+    socketio.start_background_task(_session_maintenance)
+
+@app.errorhandler(413)
+def request_too_large(e):
+    # Current student monitors truncate pastes before sending, so this is an outdated or misbehaving client
+    print(f"Rejected {request.path} request from {request.remote_addr}: body larger than {MAX_REQUEST_BYTES} bytes")
+    return jsonify({"status": "error", "message": f"Request larger than {MAX_REQUEST_BYTES} bytes"}), 413
+
 # --- API Endpoints ---
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    start_warm_up()
+    ready = is_ready()
+    body = {
+        'ready': ready,
+        'subsystems': {name: s.status() for name, s in SUBSYSTEMS.items()},
+        'timings': startup_timings(),
+    }
+    return jsonify(body), 200 if ready else 503
+
 @app.route('/api/rooms', methods=['GET'])
 @login_required
 def get_rooms():
@@ -143,7 +467,8 @@ def get_logs_for_room(room_id):
 # --- Log Activity Endpoint ---
 @app.route('/log', methods=['POST'])
 def log_activity():
-    data = request.get_json()
+    data, error = read_log_payload()
+    if error: return error
     if not data: return jsonify({"status": "error", "message": "Invalid data"}), 400
 
     room_id = data.get('room_id', 'default_room')
@@ -184,6 +509,8 @@ def log_activity():
                 elif event_type == 'drag_drop':
                     participant['stats']['drag_drop'] += 1
                     stat_updated = True
+                if stat_updated:
+                    touch_session(participant.get('session_token'))
                 break
 
     # --- PROCESS EVENT & SEND ALERT ---
@@ -197,14 +524,15 @@ def log_activity():
             log_to_db(timestamp, room_id, student_email, 'Keyword Detected', message, details=f"Keyword: {keyword}. {log_details}")
 
     elif event_type == 'paste':
-        pasted_content = data.get('pasted_content', '')
-        pasted_length = len(pasted_content)
+        pasted_content, pasted_length, truncated_sha256 = read_paste(data)
+        # The DB keeps exactly what the hash doesn't cover, so nothing is silently dropped
+        truncation_note = f"... [truncated {pasted_length - len(pasted_content)} chars, sha256={truncated_sha256}]" if truncated_sha256 else ""
         is_high_char = pasted_length > HIGH_CHAR_PASTE_THRESHOLD
         alert_type = 'High Character Paste' if is_high_char else 'Paste Detected'
         message = f'Pasted {pasted_length} characters.'
         alert_data.update({'type': alert_type, 'message': message, 'color': 'bg-red-100', 'paste_content': pasted_content})
         socketio.emit('new_alert', alert_data, room=room_id)
-        log_to_db(timestamp, room_id, student_email, alert_type, message, details=f"{pasted_content[:500]}... {log_details}")
+        log_to_db(timestamp, room_id, student_email, alert_type, message, details=f"{pasted_content}{truncation_note} {log_details}")
 
     elif event_type == 'window_title':
         title = data.get('title', '')
@@ -243,29 +571,45 @@ def handle_student_connect(data):
     room = data['room_id']
     student_details = data.get('student_details', {})
     sid = request.sid
+    student_name = student_details.get('name', 'Unknown')
+    student_email = student_details.get('email', 'N/A')
 
     if room not in room_participants:
         room_participants[room] = {}
 
-    # NEW: Initialize stats
+    start_session_maintenance()
+    token = data.get('session_token')
+    session = find_session(token, room, student_details.get('email'))
+    resumed = session is not None
+    if resumed:
+        # Drop the stale entry if the old connection's disconnect hasn't been seen yet
+        for other_sid, participant in list(room_participants[room].items()):
+            if participant.get('session_token') == token:
+                del room_participants[room][other_sid]
+        touch_session(token)
+    else:
+        token, session = create_session(room, student_details)
+
     room_participants[room][sid] = {
         'details': student_details,
-        'stats': {
-            'keywords': 0,
-            'paste': 0,
-            'window_title': 0,
-            'drag_drop': 0
-        }
+        'stats': session['stats'],
+        'session_token': token
     }
+    reply = {'session_token': token, 'resumed': resumed}
+    if wire.WIRE_FORMAT in data.get('wire_formats', []):
+        reply.update({'wire_format': wire.WIRE_FORMAT, 'wire_id': assign_wire_id(token), 'max_paste_chars': MAX_PASTE_CHARS})
+    emit('session_token', reply)
+    schedule_student_list(room)
+
+    if resumed:
+        # Keeps the audit log truthful after the 'Student Left' row queued when the old connection dropped;
+        # the dashboard learns about the resume from the collapsed student list broadcast
+        print(f"Student '{student_name}' resumed session in room '{room}'.")
+        log_connection(room, student_email, 'Student Resumed', f"Name: {student_name}")
+        return
 
-    student_name = student_details.get('name', 'Unknown')
-    student_email = student_details.get('email', 'N/A')
     print(f"Student '{student_name}' connected to room '{room}'.")
-
-    emit_student_list(room)
-
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_to_db(timestamp, room, student_email, 'Connection', 'Student Joined', f"Name: {student_name}")
+    log_connection(room, student_email, 'Student Joined', f"Name: {student_name}")
     socketio.emit('student_joined', {'name': student_name}, room=room)
 
 @socketio.on('disconnect')
@@ -289,10 +633,9 @@ def handle_disconnect():
         student_email = details.get('email', 'N/A')
 
         print(f"Student '{student_name}' disconnected from room '{room_to_update}'.")
-        emit_student_list(room_to_update)
+        schedule_student_list(room_to_update)
 
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_to_db(timestamp, room_to_update, student_email, 'Connection', 'Student Left', f"Name: {student_name}")
+        log_connection(room_to_update, student_email, 'Student Left', f"Name: {student_name}")
         socketio.emit('student_left', {'name': student_name}, room=room_to_update)
 
 # --- Frontend Serving ---
@@ -305,18 +648,32 @@ def serve(path):
         return send_from_directory(app.static_folder, 'index.html')
 
 # --- Chatbot ---
-from chatbot import get_bot_response
 @app.route('/api/chatbot', methods=['POST'])
 def chatbot_reply():
+    # Loaded on first use so the Gemini SDK isn't imported at server startup.
+    # get_bot_response runs generation on chatbot's worker pool and gives up after a timeout.
+    chatbot = SUBSYSTEMS['chatbot'].ensure()
+    if chatbot is None:
+        return jsonify({"reply": "⚠️ The assistant is unavailable right now."}), 503
     data = request.get_json()
     user_msg = data.get("message", "")
-    bot_reply = get_bot_response(user_msg)
+    bot_reply = chatbot.get_bot_response(user_msg)
     return jsonify({"reply": bot_reply})
 
+_import_seconds = time.perf_counter() - _import_started
+
+def create_app(warm_up=True):
+    """Returns the app, optionally starting subsystem initialization in the background."""
+    if warm_up:
+        start_warm_up()
+    return app
+
 if __name__ == '__main__':
+    create_app()
     port = 5000
     print("=====================================================")
     print("      EXAMJUDGE FULL STACK SERVER IS STARTING")
     print(f"  Application running at: http://127.0.0.1:{port}")
+    print(f"  Readiness: http://127.0.0.1:{port}/api/ready (server.py imported in {_import_seconds * 1000:.0f} ms)")
     print("=====================================================")
     socketio.run(app, host='0.0.0.0', port=port)
\ No newline at end of file
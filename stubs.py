@@ -0,0 +1,36 @@
+# stubs.py
+# Offline stand-ins for external services, shared by benchmark.py and the tests.
+
+import sys
+import types
+
+STUB_TOKEN = 'stub-token'
+STUB_UID = 'stub-examiner'
+STUB_EMAIL = 'examiner@stub.local'
+
+def install_firebase_stub():
+    """Registers a fake firebase_admin that initializes without a service account and accepts only STUB_TOKEN."""
+    firebase_admin = types.ModuleType('firebase_admin')
+    credentials = types.ModuleType('firebase_admin.credentials')
+    auth = types.ModuleType('firebase_admin.auth')
+
+    def certificate(path):
+        return path
+
+    def initialize_app(cred=None, *args, **kwargs):
+        return None
+
+    def verify_id_token(token):
+        if token != STUB_TOKEN:
+            raise ValueError("Invalid stub token")
+        return {'uid': STUB_UID, 'email': STUB_EMAIL}
+
+    credentials.Certificate = certificate
+    firebase_admin.initialize_app = initialize_app
+    firebase_admin.credentials = credentials
+    firebase_admin.auth = auth
+    auth.verify_id_token = verify_id_token
+
+    sys.modules['firebase_admin'] = firebase_admin
+    sys.modules['firebase_admin.credentials'] = credentials
+    sys.modules['firebase_admin.auth'] = auth
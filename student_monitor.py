@@ -13,6 +13,7 @@ from pynput import keyboard, mouse # Added mouse
 import pyperclip
 import pygetwindow as gw
 import socketio
+import wire
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QStackedWidget, QHBoxLayout, QFrame
 from PyQt5.QtCore import pyqtSignal, QObject, Qt
 from PyQt5.QtGui import QFont
@@ -51,6 +52,14 @@ ENROLLMENT_COLUMN = 'ENROLLMENTNO'
 SUBSECTION_COLUMN = 'Sub Section'
 
 SEND_INTERVAL = 10
+# Socket.IO reconnect backoff: delay doubles per attempt up to the max, randomized by +/- this factor
+# so a server restart doesn't bring every student back at the same instant
+RECONNECT_DELAY = 2
+RECONNECT_DELAY_MAX = 30
+RECONNECT_RANDOMIZATION = 0.5
+# Pastes are cut to this many characters (the rest is sent only as a SHA-256) until the
+# server advertises its own limit, so even the JSON path never uploads a whole clipboard
+DEFAULT_MAX_PASTE_CHARS = 10000
 BANNED_KEYWORDS = ["chatgpt", "gemini", "gfg", "leetcode", "stackoverflow", "chegg"]
 SCOPES = ['openid', 'https://www.googleapis.com/auth/userinfo.email', 'https://www.googleapis.com/auth/userinfo.profile']
 # ==============================================================================
@@ -73,7 +82,11 @@ class StudentMonitor:
         self.keyboard_listener = None
         self.mouse_listener = None  # NEW: Mouse Listener
         self.send_timer = None
-        self.sio = socketio.Client()
+        self.session_token = None  # issued by the server on first connect, sent back to resume
+        self.wire_id = None  # set when the server accepts the compact frame encoding
+        self.max_paste_chars = None
+        self.sio = socketio.Client(reconnection_delay=RECONNECT_DELAY, reconnection_delay_max=RECONNECT_DELAY_MAX,
+                                   randomization_factor=RECONNECT_RANDOMIZATION)
         self.setup_sio_events()
         self.signals = signal_emitter
 
@@ -84,17 +97,40 @@ class StudentMonitor:
 
     def _send_payload(self, event_type, data):
         try:
+            if event_type == 'paste':
+                content, length, digest = wire.truncate_paste(data.get('pasted_content', ''), self.max_paste_chars or DEFAULT_MAX_PASTE_CHARS)
+                data = {'pasted_content': content, 'pasted_length': length, 'truncated_sha256': digest}
+            if self.wire_id is not None:
+                frame = wire.encode_frame(self.wire_id, event_type, data)
+                response = requests.post(SERVER_URL, data=frame, headers={'Content-Type': wire.CONTENT_TYPE}, timeout=5)
+                if response.status_code != 409:
+                    self._check_response(event_type, response)
+                    return
+                # Server no longer knows our wire ID (e.g. it restarted); use JSON until we reconnect
+                self.wire_id = None
             payload = {'room_id': self.room_id, 'event_type': event_type, 'student_details': self.student_details}
             payload.update(data)
-            requests.post(SERVER_URL, json=payload, timeout=5)
+            response = requests.post(SERVER_URL, json=payload, timeout=5)
+            self._check_response(event_type, response)
         except requests.exceptions.RequestException as e:
             print(f"Error sending data: {e}")
 
+    def _check_response(self, event_type, response):
+        if response.status_code != 200:
+            print(f"Server rejected {event_type} event: HTTP {response.status_code} {response.text[:200]}")
+
     def setup_sio_events(self):
         @self.sio.event
         def connect():
             print("Socket.IO connection established...")
-            self.sio.emit('student_connect', {'room_id': self.room_id, 'student_details': self.student_details})
+            self.sio.emit('student_connect', {'room_id': self.room_id, 'student_details': self.student_details,
+                                              'session_token': self.session_token, 'wire_formats': [wire.WIRE_FORMAT]})
+        @self.sio.on('session_token')
+        def on_session_token(data):
+            self.session_token = data.get('session_token')
+            if data.get('wire_format') == wire.WIRE_FORMAT:
+                self.wire_id = data.get('wire_id')
+                self.max_paste_chars = data.get('max_paste_chars')
         @self.sio.event
         def disconnect():
             print("Socket.IO disconnected.")
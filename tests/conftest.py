@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import stubs  # noqa: E402
+
+AUTH_HEADERS = {'Authorization': f'Bearer {stubs.STUB_TOKEN}'}
+
+
+@pytest.fixture(scope='session')
+def server(tmp_path_factory):
+    """server.py imported once, with monitoring.db in a temporary directory."""
+    pytest.importorskip('flask_socketio')
+    stubs.install_firebase_stub()
+    os.chdir(tmp_path_factory.mktemp('server'))
+    import server as server_module
+    server_module.STUDENT_LIST_BROADCAST_WINDOW = 0
+    return server_module
+
+
+@pytest.fixture
+def http(server):
+    return server.app.test_client()
+
+
+@pytest.fixture
+def room(server, http, request):
+    room_id = f'room-{request.node.name}'
+    http.post('/api/rooms', json={'roomId': room_id}, headers=AUTH_HEADERS)
+    return room_id
@@ -0,0 +1,135 @@
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot
+
+
+class StubModel:
+    """Stands in for the Gemini model: counts calls and answers with the prompt's question."""
+    def __init__(self, delay=0.0, error=None):
+        self.calls = []
+        self.delay = delay
+        self.error = error
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self.lock:
+            self.calls.append(prompt)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        question = prompt.rsplit("User: ", 1)[1].split("\nAssistant:")[0]
+        return types.SimpleNamespace(text=f"answer to {question}")
+
+
+@pytest.fixture
+def model():
+    stub = StubModel()
+    chatbot.set_model(stub)
+    yield stub
+    chatbot.clear_cache()
+
+
+def test_normalized_question_hits_cache(model):
+    first = chatbot.get_bot_response("How do I create a room?")
+    second = chatbot.get_bot_response("  how do I   CREATE a room ")
+    assert first == second == "answer to How do I create a room?"
+    assert len(model.calls) == 1
+
+
+def test_concurrent_identical_questions_share_one_call():
+    stub = StubModel(delay=0.2)
+    chatbot.set_model(stub)
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append(chatbot.get_bot_response("What is ExamJudge?")))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert replies == ["answer to What is ExamJudge?"] * 8
+    assert len(stub.calls) == 1
+    chatbot.clear_cache()
+
+
+def test_timeout_reply_then_cached_answer():
+    stub = StubModel(delay=0.2)
+    chatbot.set_model(stub)
+    reply = chatbot.get_bot_response("slow question", timeout=0.01)
+    assert "taking too long" in reply
+    time.sleep(0.4)
+    assert chatbot.get_bot_response("slow question", timeout=0.01) == "answer to slow question"
+    assert len(stub.calls) == 1
+    chatbot.clear_cache()
+
+
+def test_ttl_expiry(model, monkeypatch):
+    monkeypatch.setattr(chatbot, "CACHE_TTL_SECONDS", 0.05)
+    chatbot.get_bot_response("ttl question")
+    time.sleep(0.1)
+    chatbot.get_bot_response("ttl question")
+    assert len(model.calls) == 2
+
+
+def test_lru_eviction(model, monkeypatch):
+    monkeypatch.setattr(chatbot, "CACHE_MAX_ENTRIES", 2)
+    chatbot.get_bot_response("q1")
+    chatbot.get_bot_response("q2")
+    chatbot.get_bot_response("q1")  # q1 is now most recently used
+    chatbot.get_bot_response("q3")  # evicts q2
+    assert len(model.calls) == 3
+    chatbot.get_bot_response("q1")
+    assert len(model.calls) == 3
+    chatbot.get_bot_response("q2")
+    assert len(model.calls) == 4
+
+
+def test_error_reply_is_not_cached():
+    stub = StubModel(error=RuntimeError("quota exceeded"))
+    chatbot.set_model(stub)
+    assert chatbot.get_bot_response("broken") == "⚠️ Gemini error: quota exceeded"
+    assert chatbot.get_bot_response("broken") == "⚠️ Gemini error: quota exceeded"
+    assert len(stub.calls) == 2
+    chatbot.clear_cache()
+
+
+def test_empty_message_skips_model(model):
+    assert chatbot.get_bot_response("   ") == "Please type something related to ExamJudge."
+    assert model.calls == []
+
+
+def test_late_callback_of_failed_call_keeps_retry_in_flight():
+    stub = StubModel(delay=0.2)
+    chatbot.set_model(stub)
+    key = chatbot.normalize_question("retry me")
+
+    # A failed call that is still listed in flight because its done-callback hasn't run yet
+    failed = Future()
+    failed.set_exception(RuntimeError("transient"))
+    with chatbot._cache_lock:
+        chatbot._in_flight[key] = failed
+
+    replies = []
+    retry = threading.Thread(target=lambda: replies.append(chatbot.get_bot_response("retry me")))
+    retry.start()
+    time.sleep(0.05)
+    chatbot._on_generation_done(key, failed)  # the late callback must not evict the retry
+    with chatbot._cache_lock:
+        assert chatbot._in_flight.get(key) not in (None, failed)
+
+    follower = threading.Thread(target=lambda: replies.append(chatbot.get_bot_response("retry me")))
+    follower.start()
+    retry.join()
+    follower.join()
+    assert replies == ["answer to retry me"] * 2
+    assert len(stub.calls) == 1
+    chatbot.clear_cache()
@@ -0,0 +1,228 @@
+from conftest import AUTH_HEADERS
+
+
+# --- Startup & Readiness ---
+def test_ready_when_required_subsystems_ready(server, http):
+    server.SUBSYSTEMS['database'].ensure()
+    server.SUBSYSTEMS['firebase'].ensure()
+    response = http.get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json()['subsystems']['chatbot']['required'] is False
+
+
+def test_failed_required_subsystem_keeps_ready_503(server, http, monkeypatch):
+    def broken():
+        raise RuntimeError("bad service account")
+    failed = server.Subsystem('firebase', broken)
+    failed.ensure()
+    monkeypatch.setitem(server.SUBSYSTEMS, 'firebase', failed)
+
+    response = http.get('/api/ready')
+    assert response.status_code == 503
+    assert response.get_json()['subsystems']['firebase']['state'] == 'failed'
+
+    response = http.get('/api/rooms', headers=AUTH_HEADERS)
+    assert response.status_code == 503
+
+
+# --- Session Resumption ---
+def connect_student(server, http, room, details, session_token=None, wire_formats=()):
+    client = server.socketio.test_client(server.app, flask_test_client=http)
+    client.emit('student_connect', {'room_id': room, 'student_details': details,
+                                    'session_token': session_token, 'wire_formats': list(wire_formats)})
+    reply = [m for m in client.get_received() if m['name'] == 'session_token'][0]['args'][0]
+    return client, reply
+
+
+def connection_rows(room):
+    import sqlite3
+    conn = sqlite3.connect('monitoring.db')
+    rows = conn.execute("SELECT message FROM logs WHERE room_id = ? AND event_type = 'Connection' ORDER BY id", (room,)).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+def session_row(token):
+    import sqlite3
+    conn = sqlite3.connect('monitoring.db')
+    row = conn.execute('SELECT stats, updated_at FROM sessions WHERE token = ?', (token,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_resume_restores_stats_after_restart(server, http, room):
+    details = {'email': 'resume@test.local', 'name': 'Resume'}
+    client, reply = connect_student(server, http, room, details)
+    http.post('/log', json={'room_id': room, 'event_type': 'paste', 'student_details': details, 'pasted_content': 'x'})
+    client.disconnect()
+    server.flush_sessions()
+    server.student_sessions.clear()  # as after a restart
+
+    client, resumed = connect_student(server, http, room, details, session_token=reply['session_token'])
+    assert resumed['resumed'] is True
+    participant = next(iter(server.room_participants[room].values()))
+    assert participant['stats']['paste'] == 1
+    server.flush_sessions()
+    assert connection_rows(room) == ['Student Joined', 'Student Left', 'Student Resumed']
+    client.disconnect()
+
+
+def test_stat_updates_are_batched(server, http, room):
+    details = {'email': 'batch@test.local', 'name': 'Batch'}
+    client, reply = connect_student(server, http, room, details)
+    server.flush_sessions()
+    for _ in range(3):
+        http.post('/log', json={'room_id': room, 'event_type': 'window_title', 'student_details': details, 'title': 't'})
+    assert '"window_title": 0' in session_row(reply['session_token'])[0]
+    server.flush_sessions()
+    assert '"window_title": 3' in session_row(reply['session_token'])[0]
+    client.disconnect()
+
+
+def test_expired_session_is_not_resumed_from_memory(server, http, room):
+    details = {'email': 'expired@test.local', 'name': 'Expired'}
+    client, reply = connect_student(server, http, room, details)
+    client.disconnect()
+    token = reply['session_token']
+    server.student_sessions[token]['updated_at'] -= server.SESSION_TTL_SECONDS + 1
+
+    client, again = connect_student(server, http, room, details, session_token=token)
+    assert again['resumed'] is False
+    assert again['session_token'] != token
+    assert token not in server.student_sessions
+    client.disconnect()
+
+
+def test_prune_keeps_connected_and_drops_expired(server, http, room):
+    live, live_reply = connect_student(server, http, room, {'email': 'live@test.local', 'name': 'Live'}, wire_formats=['frame-v1'])
+    gone, gone_reply = connect_student(server, http, room, {'email': 'gone@test.local', 'name': 'Gone'}, wire_formats=['frame-v1'])
+    gone.disconnect()
+    for reply in (live_reply, gone_reply):
+        server.student_sessions[reply['session_token']]['updated_at'] -= server.SESSION_TTL_SECONDS + 1
+        server._dirty_sessions.add(reply['session_token'])
+    server.flush_sessions()
+
+    server.prune_sessions()
+    assert live_reply['session_token'] in server.student_sessions
+    assert gone_reply['session_token'] not in server.student_sessions
+    assert gone_reply['wire_id'] not in server.wire_sessions
+    assert session_row(gone_reply['session_token']) is None
+    assert session_row(live_reply['session_token']) is not None
+    live.disconnect()
+
+
+# --- Compact Wire Format & Paste Limits ---
+def paste_rows(room):
+    import sqlite3
+    conn = sqlite3.connect('monitoring.db')
+    rows = conn.execute("SELECT message, details FROM logs WHERE room_id = ? AND event_type LIKE '%Paste%' ORDER BY id", (room,)).fetchall()
+    conn.close()
+    return rows
+
+
+def test_bad_pasted_length_never_raises(server, http, room):
+    import wire
+    details = {'email': 'length@test.local', 'name': 'Length'}
+    client, reply = connect_student(server, http, room, details, wire_formats=[wire.WIRE_FORMAT])
+    frame = wire.encode_frame(reply['wire_id'], 'paste', {'pasted_content': 'abc', 'pasted_length': 'xyz'})
+    assert http.post('/log', data=frame, content_type=wire.CONTENT_TYPE).status_code == 200
+    for bogus in ('1e3', -5, 1, True, [1], '9' * 5000):
+        payload = {'room_id': room, 'event_type': 'paste', 'student_details': details,
+                   'pasted_content': 'abc', 'pasted_length': bogus, 'truncated_sha256': 'a' * 64}
+        assert http.post('/log', json=payload).status_code == 200
+    assert {message for message, _ in paste_rows(room)} == {'Pasted 3 characters.'}
+    client.disconnect()
+
+
+def test_stored_paste_and_hash_cover_everything(server, http, room, monkeypatch):
+    import hashlib
+    monkeypatch.setattr(server, 'MAX_PASTE_CHARS', 1000)
+    content = ''.join(chr(ord('a') + i % 26) for i in range(2500))
+    payload = {'room_id': room, 'event_type': 'paste', 'student_details': {'email': 'big@test.local'}, 'pasted_content': content}
+    assert http.post('/log', json=payload).status_code == 200
+
+    message, details = paste_rows(room)[-1]
+    assert message == 'Pasted 2500 characters.'
+    assert details.startswith(content[:1000] + '... [truncated 1500 chars, sha256=')
+    assert hashlib.sha256(content[1000:].encode('utf-8')).hexdigest() in details
+
+
+def test_client_truncated_frame_paste(server, http, room, monkeypatch):
+    import wire
+    monkeypatch.setattr(server, 'MAX_PASTE_CHARS', 1000)
+    details = {'email': 'frame@test.local', 'name': 'Frame'}
+    client, reply = connect_student(server, http, room, details, wire_formats=[wire.WIRE_FORMAT])
+    kept, length, digest = wire.truncate_paste('z' * 4000, reply['max_paste_chars'])
+    frame = wire.encode_frame(reply['wire_id'], 'paste', {'pasted_content': kept, 'pasted_length': length, 'truncated_sha256': digest})
+    assert http.post('/log', data=frame, content_type=wire.CONTENT_TYPE).status_code == 200
+    message, stored = paste_rows(room)[-1]
+    assert message == 'Pasted 4000 characters.'
+    assert f'[truncated 3000 chars, sha256={digest}]' in stored
+    client.disconnect()
+
+
+def test_decompression_bomb_rejected(server, http, room):
+    import struct
+    import zlib
+    import wire
+    details = {'email': 'bomb@test.local', 'name': 'Bomb'}
+    client, reply = connect_student(server, http, room, details, wire_formats=[wire.WIRE_FORMAT])
+    inflated = 50 * 1024 * 1024
+    body = struct.pack('>I', inflated) + b'a' * inflated + struct.pack('>I', 0) * 2
+    frame = struct.pack('>BBBI', wire.VERSION, wire.FLAG_ZLIB, wire.EVENT_CODES['paste'], reply['wire_id']) + zlib.compress(body, 9)
+    del body
+    response = http.post('/log', data=frame, content_type=wire.CONTENT_TYPE)
+    assert response.status_code == 400
+    assert 'inflates past' in response.get_json()['message']
+    client.disconnect()
+
+
+def test_reconnect_storm_writes_in_one_batch(server, http, room, monkeypatch):
+    import sqlite3
+    students = [{'email': f'storm{i}@test.local', 'name': f'Storm {i}'} for i in range(20)]
+    connected = [connect_student(server, http, room, details) for details in students]
+    server.flush_sessions()
+
+    connects = []
+    real_connect = sqlite3.connect
+    monkeypatch.setattr(server.sqlite3, 'connect', lambda *a, **kw: connects.append(a) or real_connect(*a, **kw))
+    for (client, reply), details in zip(connected, students):
+        client.disconnect()
+        connect_student(server, http, room, details, session_token=reply['session_token'])
+    assert connects == []  # nothing touches the DB until the flush
+
+    server.flush_sessions()
+    assert len(connects) == 1
+    assert connection_rows(room).count('Student Resumed') == 20
+
+
+def test_json_client_truncated_paste(server, http, room):
+    import wire
+    kept, length, digest = wire.truncate_paste('q' * 30000, 10000)
+    payload = {'room_id': room, 'event_type': 'paste', 'student_details': {'email': 'json@test.local'},
+               'pasted_content': kept, 'pasted_length': length, 'truncated_sha256': digest}
+    assert http.post('/log', json=payload).status_code == 200
+    message, stored = paste_rows(room)[-1]
+    assert message == 'Pasted 30000 characters.'
+    assert f'[truncated 20000 chars, sha256={digest}]' in stored
+
+
+def test_client_cut_above_server_limit_keeps_both_hashes(server, http, room, monkeypatch):
+    import hashlib
+    import wire
+    monkeypatch.setattr(server, 'MAX_PASTE_CHARS', 1000)
+    content = 'r' * 1500 + 's' * 1500
+    kept, length, client_digest = wire.truncate_paste(content, 2000)
+    payload = {'room_id': room, 'event_type': 'paste', 'student_details': {'email': 'chain@test.local'},
+               'pasted_content': kept, 'pasted_length': length, 'truncated_sha256': client_digest}
+    assert http.post('/log', json=payload).status_code == 200
+    server_digest = hashlib.sha256(content[1000:2000].encode('utf-8')).hexdigest()
+    _, stored = paste_rows(room)[-1]
+    assert f'[truncated 2000 chars, sha256={server_digest}+{client_digest}]' in stored
+
+
+def test_oversized_request_gets_json_413(server, http, room, monkeypatch):
+    monkeypatch.setitem(server.app.config, 'MAX_CONTENT_LENGTH', 1024)
+    response = http.post('/log', json={'room_id': room, 'event_type': 'paste', 'pasted_content': 'x' * 4096})
+    assert response.status_code == 413
+    assert response.get_json()['status'] == 'error'
@@ -0,0 +1,31 @@
+import pytest
+
+import wire
+
+
+def test_round_trip_with_compression():
+    data = {'pasted_content': 'print("hello")\n' * 200, 'pasted_length': 3000, 'truncated_sha256': ''}
+    frame = wire.encode_frame(42, 'paste', data)
+    assert frame[1] & wire.FLAG_ZLIB
+    wire_id, event_type, fields = wire.decode_frame(frame, max_body=wire.max_body_size(10000))
+    assert (wire_id, event_type) == (42, 'paste')
+    assert fields == {'pasted_content': data['pasted_content'], 'pasted_length': '3000', 'truncated_sha256': ''}
+
+
+def test_truncated_compressed_body_rejected():
+    frame = wire.encode_frame(1, 'keystroke', {'keystrokes': 'abcdefgh' * 200})
+    with pytest.raises(wire.FrameError):
+        wire.decode_frame(frame[:-10])
+
+
+def test_uncompressed_body_over_limit_rejected():
+    frame = wire.encode_frame(1, 'window_title', {'title': 'x' * 100})
+    with pytest.raises(wire.FrameError):
+        wire.decode_frame(frame, max_body=50)
+
+
+def test_truncate_paste_hashes_remainder():
+    kept, length, digest = wire.truncate_paste('abcdef', 4)
+    assert (kept, length) == ('abcd', 6)
+    assert len(digest) == 64
+    assert wire.truncate_paste('abc', 4) == ('abc', 3, '')
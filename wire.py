@@ -0,0 +1,116 @@
+# wire.py
+# Compact binary encoding for student telemetry, shared by student_monitor.py and server.py.
+#
+# A frame replaces the JSON /log payload once the student's Socket.IO connect has
+# negotiated it. The session is referred to by a short numeric wire ID in place of
+# the full student_details dict:
+#
+#   header : version (u8) | flags (u8) | event code (u8) | wire_id (u32)
+#   body   : for each field of the event, a u32 byte length followed by UTF-8 bytes
+#
+# Bodies larger than COMPRESS_THRESHOLD are zlib-compressed (FLAG_ZLIB) when that
+# makes them smaller. All integers are big-endian.
+#
+# The format reduces bytes on the wire, not server parse time: small frames decode
+# faster than JSON, but inflating a compressed paste costs more than parsing it as
+# JSON (see `benchmark.py --wire frame`).
+
+import hashlib
+import struct
+import zlib
+
+WIRE_FORMAT = 'frame-v1'
+CONTENT_TYPE = 'application/x-examjudge-frame'
+VERSION = 1
+FLAG_ZLIB = 0x01
+COMPRESS_THRESHOLD = 512
+# Room for the per-field length prefixes and the short paste metadata fields
+BODY_OVERHEAD = 256
+
+# Field order per event type; the order is part of the format
+EVENT_FIELDS = {
+    'keystroke': ('keystrokes',),
+    'paste': ('pasted_content', 'pasted_length', 'truncated_sha256'),
+    'window_title': ('title',),
+    'drag_drop': ('source_window', 'destination_window'),
+}
+EVENT_CODES = {'keystroke': 1, 'paste': 2, 'window_title': 3, 'drag_drop': 4}
+EVENT_TYPES = {code: name for name, code in EVENT_CODES.items()}
+
+_HEADER = struct.Struct('>BBBI')
+_LENGTH = struct.Struct('>I')
+
+class FrameError(ValueError):
+    """Raised when a frame is malformed or uses an unknown version or event type."""
+
+def encode_frame(wire_id, event_type, data):
+    if event_type not in EVENT_CODES:
+        raise FrameError(f"Unknown event type: {event_type}")
+    parts = []
+    for field in EVENT_FIELDS[event_type]:
+        value = str(data.get(field, '')).encode('utf-8')
+        parts.append(_LENGTH.pack(len(value)))
+        parts.append(value)
+    body = b''.join(parts)
+
+    flags = 0
+    if len(body) > COMPRESS_THRESHOLD:
+        compressed = zlib.compress(body)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= FLAG_ZLIB
+    return _HEADER.pack(VERSION, flags, EVENT_CODES[event_type], wire_id) + body
+
+def max_body_size(max_paste_chars):
+    """Largest body a well-behaved client sends when pastes are capped at max_paste_chars (UTF-8 is at most 4 bytes/char)."""
+    return max_paste_chars * 4 + BODY_OVERHEAD
+
+def decode_frame(frame, max_body=None):
+    """Returns (wire_id, event_type, fields) for a frame produced by encode_frame.
+
+    With max_body set, bodies larger than that many bytes (after decompression) are
+    rejected, and compressed bodies are never inflated beyond it.
+    """
+    if len(frame) < _HEADER.size:
+        raise FrameError("Frame too short")
+    version, flags, code, wire_id = _HEADER.unpack_from(frame)
+    if version != VERSION:
+        raise FrameError(f"Unsupported frame version: {version}")
+    event_type = EVENT_TYPES.get(code)
+    if event_type is None:
+        raise FrameError(f"Unknown event code: {code}")
+
+    body = frame[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        decompressor = zlib.decompressobj()
+        try:
+            body = decompressor.decompress(body, max_body or 0)
+        except zlib.error as e:
+            raise FrameError(f"Bad compressed body: {e}")
+        if decompressor.unconsumed_tail:
+            raise FrameError(f"Body inflates past {max_body} bytes")
+        if not decompressor.eof:
+            raise FrameError("Truncated compressed body")
+    elif max_body is not None and len(body) > max_body:
+        raise FrameError(f"Body larger than {max_body} bytes")
+
+    fields = {}
+    offset = 0
+    try:
+        for field in EVENT_FIELDS[event_type]:
+            (length,) = _LENGTH.unpack_from(body, offset)
+            offset += _LENGTH.size
+            if offset + length > len(body):
+                raise FrameError("Field runs past end of frame")
+            fields[field] = body[offset:offset + length].decode('utf-8')
+            offset += length
+    except (struct.error, UnicodeDecodeError) as e:
+        raise FrameError(f"Malformed frame body: {e}")
+    return wire_id, event_type, fields
+
+def truncate_paste(content, max_chars):
+    """Returns (kept, total_length, truncated_sha256): content beyond max_chars is kept only as a SHA-256 hex digest."""
+    if len(content) <= max_chars:
+        return content, len(content), ''
+    digest = hashlib.sha256(content[max_chars:].encode('utf-8')).hexdigest()
+    return content[:max_chars], len(content), digest